@@ -189,6 +189,10 @@ class MusicContext(renpy.python.RevertableObject):
         return rv
 
 
+# A cache of parsed audio specs, mapping (filename, looped) pairs to
+# (filename, start, end) tuples.
+split_filename_cache = { }
+
 # The next channel number to be assigned.
 next_channel_number = 0
 
@@ -269,6 +273,10 @@ class Channel(object):
         self.file_prefix = file_prefix
         self.file_suffix = file_suffix
 
+        # The lowercased suffix, used when checking filenames against the
+        # old-format blacklist.
+        self.file_suffix_lower = file_suffix.lower()
+
         # Should we buffer upcoming music/video in the queue?
         self.buffer_queue = buffer_queue
 
@@ -289,11 +297,11 @@ class Channel(object):
 
         if movie:
             if framedrop:
-                self.movie = renpy.audio.renpysound.DROP_VIDEO
+                self.movie = renpysound.DROP_VIDEO
             else:
-                self.movie = renpy.audio.renpysound.NODROP_VIDEO
+                self.movie = renpysound.NODROP_VIDEO
         else:
-            self.movie = renpy.audio.renpysound.NO_VIDEO
+            self.movie = renpysound.NO_VIDEO
 
     def get_number(self):
         """
@@ -358,6 +366,16 @@ class Channel(object):
             except:
                 raise exception("expected float, got {!r}.".format(v))
 
+        # The common case - no audio spec at all.
+        if not filename.startswith("<"):
+            return filename, 0, -1
+
+        key = (filename, looped)
+
+        rv = split_filename_cache.get(key, None)
+        if rv is not None:
+            return rv
+
         m = re.match(r'<(.*)>(.*)', filename)
         if not m:
             return filename, 0, -1
@@ -390,7 +408,13 @@ class Channel(object):
         if (loop is not None) and looped:
             start = loop
 
-        return fn, start, end
+        if len(split_filename_cache) > 128:
+            split_filename_cache.clear()
+
+        rv = (fn, start, end)
+        split_filename_cache[key] = rv
+
+        return rv
 
     def periodic(self):
         """
@@ -398,13 +422,19 @@ class Channel(object):
         into its queues, if necessary.
         """
 
+        # Each access to the context property repeats the execution
+        # context and map lookups, so resolve it once per call.
+        ctx = self.context
+
         # Update the channel volume.
 
-        mixer_volume = renpy.game.preferences.volumes.get(self.mixer, 1.0)
+        prefs = renpy.game.preferences
+
+        mixer_volume = prefs.volumes.get(self.mixer, 1.0)
 
-        if renpy.game.preferences.self_voicing:
+        if prefs.self_voicing:
             if self.mixer not in renpy.config.voice_mixers:
-                mixer_volume = mixer_volume * renpy.game.preferences.self_voicing_volume_drop
+                mixer_volume = mixer_volume * prefs.self_voicing_volume_drop
 
         vol = self.chan_volume * mixer_volume
 
@@ -414,7 +444,7 @@ class Channel(object):
 
         # This should be set from something that checks to see if our
         # mixer is muted.
-        force_stop = self.context.force_stop or (renpy.game.preferences.mute.get(self.mixer, False) and self.stop_on_mute)
+        force_stop = ctx.force_stop or (prefs.mute.get(self.mixer, False) and self.stop_on_mute)
 
         if self.playing and force_stop:
             renpysound.stop(self.number)
@@ -461,19 +491,14 @@ class Channel(object):
             if self.synchro_start and depth:
                 break
 
-            # If the queue is full, return.
-            if renpysound.queue_depth(self.number) >= 2:
-                break
-
             # Otherwise, we might be able to enqueue something.
             topq = self.queue.pop(0)
 
             # Blacklist of old file formats we used to support, but we now
             # ignore.
-            lfn = topq.filename.lower() + self.file_suffix.lower()
-            for i in (".mod", ".xm", ".mid", ".midi"):
-                if lfn.endswith(i):
-                    topq = None
+            lfn = topq.filename.lower() + self.file_suffix_lower
+            if lfn.endswith((".mod", ".xm", ".mid", ".midi")):
+                topq = None
 
             if not topq:
                 continue
@@ -529,7 +554,7 @@ class Channel(object):
             elif self.callback:
                 self.callback() # E1102
 
-        want_pause = self.context.pause or global_pause
+        want_pause = ctx.pause or global_pause
 
         if self.paused != want_pause:
 
@@ -570,15 +595,17 @@ class Channel(object):
 
         if pcm_ok:
 
-            if self.pan_time != self.context.pan_time:
-                self.pan_time = self.context.pan_time
+            ctx = self.context
+
+            if self.pan_time != ctx.pan_time:
+                self.pan_time = ctx.pan_time
                 renpysound.set_pan(self.number,
-                                   self.context.pan,
+                                   ctx.pan,
                                    0)
 
-            if self.secondary_volume_time != self.context.secondary_volume_time:
-                self.secondary_volume_time = self.context.secondary_volume_time
-                result_volume = self.context.secondary_volume * self.context.tertiary_volume
+            if self.secondary_volume_time != ctx.secondary_volume_time:
+                self.secondary_volume_time = ctx.secondary_volume_time
+                result_volume = ctx.secondary_volume * ctx.tertiary_volume
                 renpysound.set_secondary_volume(self.number,
                                                 result_volume,
                                                 0)
@@ -590,6 +617,10 @@ class Channel(object):
         """
         Causes the playing music to be faded out for the given number
         of seconds. Also clears any queued music.
+
+        The fade itself is performed by the mixer thread inside
+        renpysound, so this returns immediately rather than blocking
+        for the duration of the fade.
         """
 
         with lock:
@@ -653,8 +684,6 @@ class Channel(object):
         if not pcm_ok:
             return None
 
-        rv = renpysound.playing_name(self.number)
-
         with lock:
 
             rv = renpysound.playing_name(self.number)
@@ -710,8 +739,15 @@ class Channel(object):
                 renpysound.set_secondary_volume(self.number, result_volume, delay)
 
     def set_tertiary_volume(self, volume):
-        self.context.tertiary_volume = volume
-        self.set_secondary_volume(self.context.secondary_volume, 0)
+        ctx = self.context
+
+        # The common case - the tertiary volume is unchanged, so there is
+        # no need to touch the context or the audio layer.
+        if ctx.tertiary_volume == volume:
+            return
+
+        ctx.tertiary_volume = volume
+        self.set_secondary_volume(ctx.secondary_volume, 0)
 
     def pause(self):
         with lock:
@@ -741,12 +777,12 @@ class Channel(object):
 try:
     from renpy.audio.androidhw import AndroidVideoChannel
 except:
-    pass
+    AndroidVideoChannel = None
 
 try:
     from renpy.audio.ioshw import IOSVideoChannel
 except:
-    pass
+    IOSVideoChannel = None
 
 # A list of channels we know about.
 all_channels = [ ]
@@ -807,9 +843,9 @@ def register_channel(name, mixer=None, loop=None, stop_on_mute=True, tight=False
     if not renpy.game.context().init_phase and (" " not in name):
         raise Exception("Can't register channel outside of init phase.")
 
-    if renpy.android and renpy.config.hw_video and name == "movie":
+    if renpy.android and renpy.config.hw_video and (AndroidVideoChannel is not None) and name == "movie":
         c = AndroidVideoChannel(name, default_loop=loop, file_prefix=file_prefix, file_suffix=file_suffix)
-    elif renpy.ios and renpy.config.hw_video and name == "movie":
+    elif renpy.ios and renpy.config.hw_video and (IOSVideoChannel is not None) and name == "movie":
         c = IOSVideoChannel(name, default_loop=loop, file_prefix=file_prefix, file_suffix=file_suffix)
     else:
         c = Channel(name, loop, stop_on_mute, tight, file_prefix, file_suffix, buffer_queue, movie=movie, framedrop=framedrop)
@@ -898,17 +934,20 @@ def init():
         return
 
     if pcm_ok is None and renpysound:
-        bufsize = 2048
-        if renpy.emscripten:
-            # Large buffer (and latency) as compromise to avoid sound jittering
-            bufsize = 8192 # works for me
-            # bufsize = 16384  # jitter/silence right after starting a sound
+        bufsize = renpy.config.sound_buffer_size
 
         if 'RENPY_SOUND_BUFSIZE' in os.environ:
             bufsize = int(os.environ['RENPY_SOUND_BUFSIZE'])
 
+        # Let the sample rate be overridden to match the output device,
+        # so the mixer does not have to resample on the fly.
+        samplerate = renpy.config.sound_sample_rate
+
+        if 'RENPY_SOUND_SAMPLERATE' in os.environ:
+            samplerate = int(os.environ['RENPY_SOUND_SAMPLERATE'])
+
         try:
-            renpysound.init(renpy.config.sound_sample_rate, 2, bufsize, False, renpy.config.equal_mono)
+            renpysound.init(samplerate, 2, bufsize, False, renpy.config.equal_mono)
             pcm_ok = True
         except:
             if renpy.config.debug_sound:
@@ -916,11 +955,10 @@ def init():
             pcm_ok = False
 
     # Find all of the mixers in the game.
-    mixers = [ ]
+    mixers = set()
 
     for c in all_channels:
-        if c.mixer not in mixers:
-            mixers.append(c.mixer)
+        mixers.add(c.mixer)
 
     default_volume = 1.0
 
@@ -928,13 +966,18 @@ def init():
         renpy.game.preferences.volumes.setdefault(m, default_volume)
         renpy.game.preferences.mute.setdefault(m, False)
 
-    with periodic_condition:
+    # The periodic callback assumes pcm_ok, so there is no point in
+    # waking a thread for it when the audio system is disabled or
+    # failed to initialize.
+    if pcm_ok:
+
+        with periodic_condition:
 
-        periodic_thread_quit = False
+            periodic_thread_quit = False
 
-        periodic_thread = threading.Thread(target=periodic_thread_main)
-        periodic_thread.daemon = True
-        periodic_thread.start()
+            periodic_thread = threading.Thread(target=periodic_thread_main)
+            periodic_thread.daemon = True
+            periodic_thread.start()
 
 
 def quit(): # @ReservedAssignment
@@ -957,7 +1000,8 @@ def quit(): # @ReservedAssignment
         return
 
     for c in all_channels:
-        c.dequeue()
+        # fadeout also dequeues, so there's no need for a separate
+        # dequeue call.
         c.fadeout(0)
 
         c.queue = [ ]
@@ -995,19 +1039,14 @@ def periodic_pass():
 
     try:
 
-        # A list of emphasized channels.
-        emphasize_channels = [ ]
+        # Is an emphasized channel playing?
         emphasized = False
 
-        for i in renpy.config.emphasize_audio_channels:
-            c = get_channel(i)
-            emphasize_channels.append(c)
-
-            if c.get_playing():
-                emphasized = True
-
-        if not renpy.game.preferences.emphasize_audio:
-            emphasized = False
+        if renpy.game.preferences.emphasize_audio:
+            for i in renpy.config.emphasize_audio_channels:
+                if get_channel(i).get_playing():
+                    emphasized = True
+                    break
 
         if emphasized and not old_emphasized:
             vol = renpy.config.emphasize_audio_volume
@@ -1019,6 +1058,9 @@ def periodic_pass():
         old_emphasized = emphasized
 
         if vol is not None:
+
+            emphasize_channels = [ get_channel(i) for i in renpy.config.emphasize_audio_channels ]
+
             for c in all_channels:
                 if c in emphasize_channels:
                     continue
@@ -1051,6 +1093,9 @@ def periodic_pass():
     except:
         if renpy.config.debug_sound:
             raise
+        else:
+            renpy.display.log.write("Exception in the audio periodic callback:")
+            renpy.display.log.exception()
 
 
 # The exception that's been thrown by the periodic thread.
@@ -1099,8 +1144,15 @@ def periodic():
 
     with periodic_condition:
 
+        # Make sure every channel has a MusicContext before handing
+        # off to the periodic thread, as these participate in rollback
+        # and so must be created on the main thread. A single lookup
+        # of the map replaces a full get_context per channel.
+        mcd = renpy.game.context().music
+
         for c in all_channels:
-            c.get_context()
+            if c.name not in mcd:
+                c.get_context()
 
         if periodic_exc is not None:
             exc = periodic_exc
@@ -1140,11 +1192,15 @@ def interact():
                 filenames = ctx.last_filenames
                 tight = ctx.last_tight
 
-                if c.loop:
-                    if not filenames or c.get_playing() not in filenames:
-                        c.fadeout(renpy.config.fade_music)
+                # Decide separately if the old music needs to be faded
+                # out, and if new music needs to be started.
+                stop_old = c.loop and (not filenames or c.get_playing() not in filenames)
+                start_new = bool(filenames)
 
-                if filenames:
+                if stop_old:
+                    c.fadeout(renpy.config.fade_music)
+
+                if start_new:
                     c.enqueue(filenames, loop=True, synchro_start=True, tight=tight)
 
                 c.last_changed = ctx.last_changed
@@ -1174,7 +1230,7 @@ def autoreload(_fn):
     the channels, as needed.)
     """
 
-    print("Sound autoreload", _fn)
+    renpy.display.log.write("Sound autoreload %s", _fn)
 
     for c in all_channels:
         c.reload()
@@ -1191,6 +1247,10 @@ def pause_all():
     """
 
     global global_pause
+
+    if global_pause:
+        return
+
     global_pause = True
 
     periodic()
@@ -1202,6 +1262,10 @@ def unpause_all():
     """
 
     global global_pause
+
+    if not global_pause:
+        return
+
     global_pause = False
 
     periodic()
@@ -334,6 +334,10 @@ def get_delay(time, channel="music"):
         if not t or t < 0:
             return None
 
+        # Channel.get_pos reports milliseconds, while `time` is in
+        # seconds.
+        t = t / 1000.0
+
         if t > time:
             return 0
 
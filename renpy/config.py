@@ -138,6 +138,15 @@ mouse = None
 # The default sound playback sample rate.
 sound_sample_rate = 48000
 
+# The size of the sound playback buffer, in samples. Smaller buffers
+# lower the latency of sound playback, at the cost of skipping when
+# the buffer can't be refilled in time.
+sound_buffer_size = 2048
+
+if renpy.emscripten:
+    # Large buffer (and latency) as compromise to avoid sound jittering.
+    sound_buffer_size = 8192
+
 # The amount of time music is faded out between tracks.
 fade_music = 0.0
 